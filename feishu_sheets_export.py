@@ -2,9 +2,20 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import functools
+import re
 import sys
 import requests
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from typing import List, Optional, Tuple
+from urllib3.util.retry import Retry
+
+try:
+    import ijson
+except ImportError:  # 没装ijson时退回resp.json()整体解析
+    ijson = None
 
 
 # 需要到飞书后台创建一个应用, 获取APP_ID和APP_SECRET,自己上网搜吧
@@ -18,6 +29,10 @@ SHEET_ID = ""
 # 要拉取的范围,比如从第一列到第六列,就是A1:F(这个自己尝试吧)
 RANGE = "A1:F"
 
+# 大表按行切块并发拉取,每块的行数和并发数
+CHUNK_ROWS = 2000
+MAX_WORKERS = 4
+
 OUT_CSV = "language.csv"
 
 
@@ -26,10 +41,27 @@ TENANT_TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token
 SHEETS_VALUES_GET_V2 = (
     "https://open.feishu.cn/open-apis/sheets/v2/spreadsheets/{token}/values/{range}"
 )
+# 工作表元信息,用来获取总行数
+SHEET_META_GET_V3 = (
+    "https://open.feishu.cn/open-apis/sheets/v3/spreadsheets/{token}/sheets/{sheet_id}"
+)
+# 响应中每一行数据在JSON里的路径,流式解析时使用
+VALUES_ITEM_PREFIX = "data.valueRange.values.item"
+
+# 复用同一个Session,获取token和读取表格共享到open.feishu.cn的keep-alive连接,省掉重复的TCP/TLS握手
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+    ),
+)
 
 
 def get_tenant_access_token() -> str:
-    resp = requests.post(
+    resp = _SESSION.post(
         TENANT_TOKEN_URL,
         json={"app_id": APP_ID, "app_secret": APP_SECRET},
         timeout=15,
@@ -41,40 +73,110 @@ def get_tenant_access_token() -> str:
     return data["tenant_access_token"]
 
 
-def fetch_sheet_values(token: str) -> List[List[str]]:
-    headers = {"Authorization": f"Bearer {token}"}
-    all_rows: List[List[str]] = []
+def parse_range(rng: str) -> Tuple[str, int, str, Optional[int]]:
+    """把A1:F这样的范围拆成(起始列, 起始行, 结束列, 结束行),结束行没写时为None"""
+    m = re.fullmatch(r"([A-Za-z]+)(\d*):([A-Za-z]+)(\d*)", rng.strip())
+    if not m:
+        raise ValueError(f"RANGE格式不正确: {rng}")
+    start_col, start_row, end_col, end_row = m.groups()
+    return start_col.upper(), int(start_row or 1), end_col.upper(), int(end_row) if end_row else None
 
-    rng = f"{SHEET_ID}!{RANGE}"
-    url = SHEETS_VALUES_GET_V2.format(token=SPREADSHEET_TOKEN, range=rng)
-    resp = requests.get(url, headers=headers, params={"valueRenderOption": "ToString"}, timeout=25)
+
+def get_sheet_row_count(token: str) -> int:
+    url = SHEET_META_GET_V3.format(token=SPREADSHEET_TOKEN, sheet_id=SHEET_ID)
+    resp = _SESSION.get(url, headers={"Authorization": f"Bearer {token}"}, timeout=15)
     resp.raise_for_status()
     data = resp.json()
     if data.get("code") != 0:
-        raise RuntimeError(f"读取表格失败({rng}): {data}")
+        raise RuntimeError(f"获取工作表信息失败: {data}")
+
+    sheet = (data.get("data") or {}).get("sheet") or {}
+    return (sheet.get("grid_properties") or {}).get("row_count") or 0
+
 
-    value_range = (data.get("data") or {}).get("valueRange") or {}
-    values = value_range.get("values") or []
-    for row in values:
-        all_rows.append(["" if v is None else str(v) for v in row])
+def fetch_sheet_chunk(
+    token: str, start_row: int, end_row: int, start_col: str, end_col: str
+) -> List[List[str]]:
+    # 明确要求压缩传输,流式读取时由urllib3边解压边交给ijson
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip, deflate"}
+    _str = str
+
+    rng = f"{SHEET_ID}!{start_col}{start_row}:{end_col}{end_row}"
+    url = SHEETS_VALUES_GET_V2.format(token=SPREADSHEET_TOKEN, range=rng)
+    params = {"valueRenderOption": "ToString"}
+    with _SESSION.get(url, headers=headers, params=params, timeout=25, stream=ijson is not None) as resp:
+        resp.raise_for_status()
+        if ijson is None:
+            data = resp.json()
+            if data.get("code") != 0:
+                raise RuntimeError(f"读取表格失败({rng}): {data}")
+
+            value_range = (data.get("data") or {}).get("valueRange") or {}
+            values = value_range.get("values") or []
+            rows: List[List[str]] = [None] * len(values)
+            for i, row in enumerate(values):
+                rows[i] = ["" if v is None else _str(v) for v in row]
+            return rows
+
+        # 流式解析响应,边读边转换每一行,不在内存里构造完整的响应dict
+        resp.raw.read = functools.partial(resp.raw.read, decode_content=True)
+        status = {}
+        rows = []
+        append = rows.append
+
+        def events():
+            for event in ijson.parse(resp.raw, use_float=True):
+                if event[0] in ("code", "msg"):
+                    status[event[0]] = event[2]
+                yield event
+
+        for row in ijson.items(events(), VALUES_ITEM_PREFIX):
+            append(["" if v is None else _str(v) for v in row])
+
+    if status.get("code") != 0:
+        raise RuntimeError(f"读取表格失败({rng}): {status}")
+    return rows
+
+
+def fetch_sheet_values(token: str) -> List[List[str]]:
+    start_col, start_row, end_col, end_row = parse_range(RANGE)
+    if end_row is None:
+        end_row = get_sheet_row_count(token)
+    if end_row < start_row:
+        return []
+
+    chunks = [
+        (lo, min(lo + CHUNK_ROWS - 1, end_row))
+        for lo in range(start_row, end_row + 1, CHUNK_ROWS)
+    ]
+    # 多个线程共用_SESSION的连接池,map按提交顺序返回结果
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(
+            lambda c: fetch_sheet_chunk(token, c[0], c[1], start_col, end_col), chunks
+        ))
+
+    all_rows: List[List[str]] = []
+    for (lo, hi), rows in zip(chunks, results):
+        all_rows.extend(rows)
+        # 接口会省略块尾部的空行,中间的块补齐空行,保证后面块的行号不错位
+        if hi < end_row:
+            all_rows.extend([] for _ in range(hi - lo + 1 - len(rows)))
 
     return all_rows
 
 
 def write_csv(rows: List[List[str]]) -> None:
     def is_empty_row(r: List[str]) -> bool:
-        return all((c or "").strip() == "" for c in r)
-
-    trimmed: List[List[str]] = []
-    for r in rows:
-        trimmed.append(r)
-    while trimmed and is_empty_row(trimmed[-1]):
-        trimmed.pop()
-
-    with open(OUT_CSV, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        for r in trimmed:
-            writer.writerow(r)
+        # isspace()不分配新字符串,遇到第一个非空单元格就停止
+        return not any(c and not c.isspace() for c in r)
+
+    # 从尾部往前找最后一个非空行,不复制整张表
+    last = len(rows)
+    while last and is_empty_row(rows[last - 1]):
+        last -= 1
+
+    with open(OUT_CSV, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        csv.writer(f).writerows(islice(rows, last))
 
 
 def main():
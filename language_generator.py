@@ -9,10 +9,17 @@
 import json
 import os
 import sys
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, TextIO, Tuple
 from dataclasses import dataclass
 import argparse
 
+try:
+    import orjson
+except ImportError:  # 没装orjson时使用标准库json
+    orjson = None
+
 @dataclass
 class LanguageConfig:
     """语言配置"""
@@ -31,67 +38,90 @@ LANGUAGES = {
     "ko": LanguageConfig("ko", "韩语", "intl_ko.arb"),
     "tr": LanguageConfig("tr", "土耳其语", "intl_tr.arb"),
 }
+# 解析标题行时用来匹配语言代码
+_LANG_CODES = frozenset(LANGUAGES)
 
 class FeishuI18nGenerator:
     """飞书多语言生成器"""
     
     def __init__(self):
         os.makedirs(ARB_DIR, exist_ok=True)
+        # 各语言arb文件的完整路径
+        self._paths = {
+            lang_code: os.path.join(ARB_DIR, lang_config.file_name)
+            for lang_code, lang_config in LANGUAGES.items()
+        }
     
-    def parse_csv_data(self, csv_content: str) -> Dict[str, Dict[str, str]]:
-        """解析CSV格式的多语言数据"""
+    def parse_csv_stream(self, f: TextIO) -> Dict[str, Dict[str, str]]:
+        """从文件流解析CSV格式的多语言数据，BOM由打开文件时的utf-8-sig编码处理"""
         import csv
-        from io import StringIO
-        
-        # 处理BOM
-        if csv_content.startswith('\ufeff'):
-            csv_content = csv_content[1:]
         
-        # 使用csv模块正确解析CSV
-        csv_reader = csv.reader(StringIO(csv_content))
-        rows = list(csv_reader)
+        # 使用csv模块正确解析CSV，逐行读取，不把整个文件读进内存
+        csv_reader = csv.reader(f)
+        header_row = next(csv_reader, None)
         
-        if len(rows) < 2:
+        if header_row is None:
             raise ValueError("CSV数据至少需要包含标题行和一行数据")
         
-        # 解析标题行，过滤空列
-        headers = [h.strip() for h in rows[0] if h.strip()]
-        
-        # 检查是否包含key列
-        if 'key' not in headers:
-            raise ValueError("CSV必须包含'key'列")
-        
-        key_index = headers.index('key')
-        
-        # 找到语言列 - 直接匹配语言代码
+        # 解析标题行，一次遍历同时找到key列和语言列，跳过空列
+        # 下标取自原始标题行，空列不会让后面的列错位
+        key_index = -1
         language_columns = {}
-        for i, header in enumerate(headers):
-            if header.lower() == 'key':
+        for i, header in enumerate(header_row):
+            header = header.strip().lower()
+            if not header:
                 continue
+            if header == 'key':
+                if key_index < 0:
+                    key_index = i
             # 直接匹配语言代码
-            if header.lower() in LANGUAGES:
-                language_columns[header.lower()] = i
+            elif header in _LANG_CODES:
+                language_columns[sys.intern(header)] = i
+        
+        # 检查是否包含key列
+        if key_index < 0:
+            raise ValueError("CSV必须包含'key'列")
         
         if not language_columns:
             raise ValueError("未找到任何支持的语言列")
         
+        # 行宽覆盖所有语言列时不必逐个检查下标，用itemgetter一次取出所有语言列
+        lang_items = tuple(language_columns.items())
+        lang_codes = tuple(language_columns)
+        full_width = max(language_columns.values()) + 1
+        pick = itemgetter(*language_columns.values())
+        if len(lang_codes) == 1:
+            # 只有一列时itemgetter返回的是单个值而不是tuple
+            pick_one = pick
+            pick = lambda row: (pick_one(row),)
+        
         # 解析数据
         result = {}
-        for row in rows[1:]:
+        has_data = False
+        for row in csv_reader:
+            has_data = True
             if not row or len(row) <= key_index:
                 continue
                 
             key = row[key_index].strip()
             if not key:
                 continue
+            key = sys.intern(key)
                 
-            result[key] = {}
-            for lang_code, col_index in language_columns.items():
-                if col_index < len(row):
-                    value = row[col_index].strip()
-                    # 清理值中的引号和换行符
+            translations = result[key] = {}
+            if len(row) >= full_width:
+                cells = zip(lang_codes, pick(row))
+            else:
+                cells = [(c, row[i]) for c, i in lang_items if i < len(row)]
+            for lang_code, value in cells:
+                value = value.strip()
+                # 清理值中的引号和换行符，没有反斜杠的值直接跳过
+                if '\\' in value:
                     value = value.replace('\\n', '\n').replace('\\"', '"')
-                    result[key][lang_code] = value
+                translations[lang_code] = value
+        
+        if not has_data:
+            raise ValueError("CSV数据至少需要包含标题行和一行数据")
         
         return result
     
@@ -99,20 +129,34 @@ class FeishuI18nGenerator:
         """生成JSON格式的多语言文件"""
         print("正在生成JSON文件...")
         
+        # 一次遍历把所有语言的键值对分别收集好
+        buckets = {lang_code: {} for lang_code in LANGUAGES}
+        for key, translations in i18n_data.items():
+            for lang_code, value in translations.items():
+                if value:
+                    bucket = buckets.get(lang_code)
+                    if bucket is not None:
+                        bucket[key] = value
+        
+        # 各语言文件互不依赖，用线程池并发写出
+        with ThreadPoolExecutor(max_workers=len(LANGUAGES)) as executor:
+            list(executor.map(self._write_one, buckets.items()))
+        
         for lang_code, lang_config in LANGUAGES.items():
-            file_path = os.path.join(ARB_DIR, lang_config.file_name)
-            lang_data = {}
-            
-            # 收集该语言的所有键值对
-            for key, translations in i18n_data.items():
-                if lang_code in translations and translations[lang_code]:
-                    lang_data[key] = translations[lang_code]
-            
-            # 保存JSON文件
+            print(f"  ✅ 生成 {lang_config.file_name} ({len(buckets[lang_code])} 个键值对)")
+    
+    def _write_one(self, item: Tuple[str, Dict[str, str]]) -> None:
+        """写出单个语言的arb文件"""
+        lang_code, lang_data = item
+        file_path = self._paths[lang_code]
+        
+        # 保存JSON文件，有orjson时直接写出UTF-8字节，输出格式与json.dump一致
+        if orjson is not None:
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(lang_data, option=orjson.OPT_INDENT_2))
+        else:
             with open(file_path, 'w', encoding='utf-8') as f:
                 json.dump(lang_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"  ✅ 生成 {lang_config.file_name} ({len(lang_data)} 个键值对)")
     
     def validate_data(self, i18n_data: Dict[str, Dict[str, str]]) -> None:
         """验证多语言数据"""
@@ -120,25 +164,24 @@ class FeishuI18nGenerator:
         
         # 统计信息
         total_keys = len(i18n_data)
-        language_counts = {lang: 0 for lang in LANGUAGES.keys()}
+        langs = tuple(LANGUAGES)
+        language_counts = dict.fromkeys(langs, 0)
+        # 统计数量和检查缺失的翻译在同一次遍历中完成
+        missing_translations = []
         
         for key, translations in i18n_data.items():
-            for lang_code in LANGUAGES.keys():
-                if lang_code in translations and translations[lang_code]:
+            get = translations.get
+            for lang_code in langs:
+                if get(lang_code):
                     language_counts[lang_code] += 1
+                else:
+                    missing_translations.append((key, lang_code))
         
         print(f"  总键数: {total_keys}")
         for lang_code, count in language_counts.items():
             lang_name = LANGUAGES[lang_code].name
             print(f"  {lang_name} ({lang_code}): {count} 个键值对")
         
-        # 检查缺失的翻译
-        missing_translations = []
-        for key, translations in i18n_data.items():
-            for lang_code in LANGUAGES.keys():
-                if lang_code not in translations or not translations[lang_code]:
-                    missing_translations.append((key, lang_code))
-        
         if missing_translations:
             print(f"\n  ⚠️ 发现 {len(missing_translations)} 个缺失的翻译:")
             for key, lang_code in missing_translations[:10]:  # 只显示前10个
@@ -159,8 +202,8 @@ def main():
     try:
         # 解析CSV数据
         print(f"正在解析CSV文件: {args.csv}")
-        with open(args.csv, 'r', encoding='utf-8') as f:
-            i18n_data = generator.parse_csv_data(f.read())
+        with open(args.csv, 'r', encoding='utf-8-sig', newline='') as f:
+            i18n_data = generator.parse_csv_stream(f)
         
         # 验证数据
         generator.validate_data(i18n_data)